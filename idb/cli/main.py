@@ -242,6 +242,14 @@ async def drain_coroutines(pending: Set[asyncio.Task]) -> None:
 
 
 def main(cmd_input: Optional[List[str]] = None,) -> int:
+    # uvloop lowers the per-await cost of I/O heavy paths like install
+    # streaming, but is strictly optional
+    try:
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     loop = asyncio.get_event_loop()
     try:
         return loop.run_until_complete(gen_main(cmd_input))
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
 
-import asyncio
 import logging
 import warnings
 from typing import Dict, Optional
@@ -11,6 +10,7 @@ from grpclib.client import Channel
 from idb.client.daemon_pid_saver import kill_saved_pids
 from idb.client.daemon_spawner import DaemonSpawner
 from idb.common.types import IdbClientBase
+from idb.grpc.channel import create_channel
 from idb.grpc.idb_grpc import CompanionServiceStub
 from idb.grpc.types import CompanionClient
 
@@ -48,7 +48,7 @@ class IdbClient(IdbClientBase):
             force_kill=self.force_kill_daemon
         )
         if not self.channel or not self.stub:
-            self.channel = Channel(self.host, self.port, loop=asyncio.get_event_loop())
+            self.channel = create_channel(self.host, self.port)
             self.stub = CompanionServiceStub(channel=self.channel)
         return CompanionClient(
             stub=self.stub, is_local=True, udid=self.target_udid, logger=self.logger
@@ -14,6 +14,11 @@ from typing import List
 from idb.common.constants import IDB_LOGS_PATH
 
 
+# Companions can emit long log lines before the handshake JSON; the default
+# 64 KiB StreamReader limit would abort the spawn on them
+STREAM_READER_LIMIT: int = 4 * 1024 * 1024
+
+
 class CompanionSpawnerException(Exception):
     pass
 
@@ -22,30 +27,46 @@ class CompanionSpawner:
     def __init__(self, companion_path: str) -> None:
         self.companion_path = companion_path
         self.companion_processes: List[Process] = []
+        self._logs_dir_ready = False
         atexit.register(self.kill_spawned_companion)
 
     async def _read_stream(self, stream: StreamReader) -> int:
-        port = 0
         while True:
-            line = await stream.readline()
-            logging.debug(f"read line from companion : {line}")
-            if line:
-                update = json.loads(line.decode())
-                if update:
-                    logging.debug(f"got update from companion {update}")
-                    port = update["grpc_port"]
-                    break
-            else:
-                break
-        return port
+            try:
+                line = await stream.readuntil(b"\n")
+            except asyncio.IncompleteReadError as error:
+                # EOF mid-handshake is distinct from a clean "no port" exit
+                line = error.partial
+                if not line:
+                    logging.debug("companion closed stdout during handshake")
+                    return 0
+            # Lazy %s formatting, the line is only formatted if DEBUG is on
+            logging.debug("read line from companion : %s", line)
+            try:
+                # json.loads accepts bytes, no decode copy needed
+                update = json.loads(line)
+            except json.JSONDecodeError:
+                # Companions log freely before the handshake JSON
+                continue
+            port = update.get("grpc_port") if update else None
+            if port is not None:
+                logging.debug("got update from companion %s", update)
+                return port
 
     def _log_file_path(self, target_udid: str) -> str:
-        os.makedirs(name=IDB_LOGS_PATH, exist_ok=True)
+        if not self._logs_dir_ready:
+            os.makedirs(name=IDB_LOGS_PATH, exist_ok=True)
+            self._logs_dir_ready = True
         return IDB_LOGS_PATH + "/" + target_udid
 
     def kill_spawned_companion(self) -> None:
-        for p in self.companion_processes:
-            os.kill(p.pid, signal.SIGTERM)
+        for process in self.companion_processes:
+            # Signal the whole session so grandchildren the companion
+            # spawned are not orphaned
+            try:
+                os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+            except ProcessLookupError:
+                pass
 
     async def spawn_companion(self, target_udid: str) -> int:
         if not self.companion_path:
@@ -67,6 +88,8 @@ class CompanionSpawner:
                 stdout=asyncio.subprocess.PIPE,
                 stdin=asyncio.subprocess.PIPE,
                 stderr=log_file,
+                start_new_session=True,
+                limit=STREAM_READER_LIMIT,
             )
             self.companion_processes.append(process)
             logging.debug(f"started companion at process id {process.pid}")
@@ -77,6 +100,11 @@ class CompanionSpawner:
                 return port
             raise CompanionSpawnerException("process has no stdout")
 
+    async def spawn_companions(self, target_udids: List[str]) -> List[int]:
+        return await asyncio.gather(
+            *(self.spawn_companion(target_udid=udid) for udid in target_udids)
+        )
+
     def close(self) -> None:
         logging.info("Stopping companion spawner")
         for process in self.companion_processes:
@@ -6,11 +6,17 @@ import asyncio
 import sys
 from typing import AsyncContextManager, AsyncIterator
 
+from idb.common.misc import has_executable
 from idb.utils.contextlib import asynccontextmanager
 from idb.utils.typing import none_throws
 
 
 READ_CHUNK_SIZE: int = 1024 * 1024 * 4  # 4Mb, the default max read for gRPC
+# Level 1 wins a few multiples of compression speed for a few percent of
+# ratio on Mach-O binaries
+COMPRESSION_COMMAND = (
+    "pigz -1 -c" if has_executable("pigz") else "gzip -1 --to-stdout"
+)
 
 
 @asynccontextmanager  # noqa T484
@@ -31,7 +37,7 @@ async def _create_gzip_compress_command(
     path: str,
 ) -> AsyncContextManager[asyncio.subprocess.Process]:
     process = await asyncio.create_subprocess_shell(
-        f"gzip -v '{path}' --to-stdout",
+        f"{COMPRESSION_COMMAND} '{path}'",
         stdin=asyncio.subprocess.PIPE,
         stderr=sys.stderr,
         stdout=asyncio.subprocess.PIPE,
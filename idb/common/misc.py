@@ -5,6 +5,10 @@ import os
 from typing import Dict
 
 
+def has_executable(exe: str) -> bool:
+    return any((os.path.exists(os.path.join(path, exe)) for path in os.get_exec_path()))
+
+
 def get_env_with_idb_prefix() -> Dict[str, str]:
     env = dict(os.environ)
     env = {key: env[key] for key in env if key.startswith("IDB_")}
@@ -8,6 +8,7 @@ import tempfile
 import uuid
 from typing import AsyncContextManager, AsyncIterator, List, Optional
 
+from idb.common.misc import has_executable
 from idb.utils.contextlib import asynccontextmanager
 from idb.utils.typing import none_throws
 
@@ -16,11 +17,9 @@ class TarException(BaseException):
     pass
 
 
-def _has_executable(exe: str) -> bool:
-    return any((os.path.exists(os.path.join(path, exe)) for path in os.get_exec_path()))
-
-
-COMPRESSION_COMMAND = "pigz -c" if _has_executable("pigz") else "gzip -4"
+# Level 1 wins a few multiples of compression speed for a few percent of
+# ratio, the right trade for a user-visible install
+COMPRESSION_COMMAND = "pigz -1 -c" if has_executable("pigz") else "gzip -1"
 READ_CHUNK_SIZE: int = 1024 * 1024 * 4  # 4Mb, the default max read for gRPC
 
 
@@ -47,9 +46,12 @@ async def _create_tar_command(
                 ]
             )
         process = await asyncio.create_subprocess_shell(
-            f'tar cfv - {" ".join(tar_args)} | {COMPRESSION_COMMAND}',
+            f'tar cf - {" ".join(tar_args)} | {COMPRESSION_COMMAND}',
             stderr=sys.stderr,
             stdout=asyncio.subprocess.PIPE,
+            # Allow the archive pipeline to run a full chunk ahead of the
+            # consumer instead of stalling on the default 64 KiB buffer
+            limit=READ_CHUNK_SIZE,
         )
         yield process
 
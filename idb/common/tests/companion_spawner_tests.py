@@ -19,10 +19,11 @@ class CompanionSpawnerTest(TestCase):
             new=AsyncMock(),
         ) as exec_mock, mock.patch("idb.common.companion_spawner.open"):
             process_mock = mock.Mock()
-            process_mock.stdout.readline = AsyncMock(
+            process_mock.stdout.readuntil = AsyncMock(
                 return_value=json.dumps(
                     {"hostname": "myHost", "grpc_port": 1234}
                 ).encode("utf-8")
+                + b"\n"
             )
             exec_mock.return_value = process_mock
             port = await spawner.spawn_companion(udid)
@@ -35,10 +36,39 @@ class CompanionSpawnerTest(TestCase):
                 stdout=mock.ANY,
                 stdin=mock.ANY,
                 stderr=mock.ANY,
+                start_new_session=True,
+                limit=mock.ANY,
             )
             self.assertEqual(port, 1234)
             self.assertEqual(spawner.companion_processes, [process_mock])
 
+    async def test_spawn_companion_skips_non_json_lines(self) -> None:
+        spawner = CompanionSpawner("idb_path")
+        spawner._log_file_path = mock.Mock()
+        with mock.patch(
+            "idb.common.companion_spawner.asyncio.create_subprocess_exec",
+            new=AsyncMock(),
+        ) as exec_mock, mock.patch("idb.common.companion_spawner.open"):
+            process_mock = mock.Mock()
+            process_mock.stdout.readuntil = AsyncMock(
+                side_effect=[
+                    b"companion starting up\n",
+                    json.dumps({"hostname": "myHost", "grpc_port": 1234}).encode(
+                        "utf-8"
+                    )
+                    + b"\n",
+                ]
+            )
+            exec_mock.return_value = process_mock
+            port = await spawner.spawn_companion("someUdid")
+            self.assertEqual(port, 1234)
+
+    async def test_spawn_companions(self) -> None:
+        spawner = CompanionSpawner("idb_path")
+        spawner.spawn_companion = AsyncMock(side_effect=[1234, 1235])
+        ports = await spawner.spawn_companions(["udidA", "udidB"])
+        self.assertEqual(ports, [1234, 1235])
+
     async def test_close(self) -> None:
         spawner = CompanionSpawner("idb_path")
         spawner.companion_processes = [mock.Mock() for _ in range(3)]
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import asyncio
+import socket
+from typing import Any
+
+from grpclib.client import Channel
+
+
+# Sized so that send_message rarely stalls on the kernel buffer during
+# bulk install streaming
+SNDBUF_SIZE: int = 4 * 1024 * 1024
+
+
+class TunedChannel(Channel):
+    """A Channel that enlarges the socket send buffer on connect, sized
+    for the bulk transfers performed by install streams."""
+
+    # pyre-ignore
+    async def __connect__(self) -> Any:
+        protocol = await super().__connect__()
+        _tune_protocol(protocol)
+        return protocol
+
+
+# pyre-ignore
+def _find_transport(protocol: Any) -> Any:
+    # Best effort: dig the transport out of the protocol, the attribute
+    # placement differs between grpclib versions
+    transport = getattr(protocol, "transport", None)
+    if transport is not None:
+        return transport
+    connection = getattr(protocol, "connection", None)
+    if connection is None:
+        return None
+    transport = getattr(connection, "transport", None)
+    if transport is not None:
+        return transport
+    # grpclib keeps the transport private on its Connection wrapper
+    return getattr(connection, "_transport", None)
+
+
+# pyre-ignore
+def _tune_protocol(protocol: Any) -> None:
+    transport = _find_transport(protocol)
+    if transport is None:
+        return
+    sock = transport.get_extra_info("socket")
+    if sock is None or sock.family not in (socket.AF_INET, socket.AF_INET6):
+        return
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SNDBUF_SIZE)
+
+
+def create_channel(host: str, port: int) -> Channel:
+    return TunedChannel(host, port, loop=asyncio.get_event_loop())
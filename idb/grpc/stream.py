@@ -8,6 +8,7 @@ from typing import Any, AsyncIterator, Dict, Generic, Optional, TypeVar
 from idb.utils.typing import none_throws
 
 
+_T = TypeVar("_T")
 _TSend = TypeVar("_TSend")
 _TRecv = TypeVar("_TRecv")
 
@@ -41,6 +42,52 @@ async def drain_to_stream(
         return response
 
 
+async def prefetch(
+    generator: AsyncIterator[_T], depth: int = 4
+) -> AsyncIterator[_T]:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=depth)
+
+    async def _producer() -> None:
+        try:
+            async for item in generator:
+                await queue.put(item)
+        except asyncio.CancelledError:
+            # The consumer is gone and will never drain the queue again:
+            # deliver the sentinel without blocking, dropping a buffered
+            # item if needed since the stream is aborting anyway
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+            raise
+        except BaseException:
+            await queue.put(None)
+            raise
+        else:
+            await queue.put(None)
+
+    producer = asyncio.ensure_future(_producer())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield item
+        # Surfaces any exception the generator raised
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except (Exception, asyncio.CancelledError):
+                pass
+        # Finalize the source if it was left suspended at a yield, running
+        # e.g. the tar/gzip subprocess cleanup on aborted installs
+        aclose = getattr(generator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
 async def generate_bytes(
     stream: AsyncIterator[Any],  # pyre-ignore
 ) -> AsyncIterator[bytes]:
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import asyncio
+import socket
+
+from idb.grpc.channel import TunedChannel, _find_transport
+from idb.utils.testing import TestCase, ignoreTaskLeaks
+
+
+@ignoreTaskLeaks
+class TunedChannelTests(TestCase):
+    async def test_sndbuf_enlarged_on_connect(self) -> None:
+        server = await asyncio.start_server(
+            lambda reader, writer: None, "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        control = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        default_sndbuf = control.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+        control.close()
+        channel = TunedChannel("127.0.0.1", port, loop=asyncio.get_event_loop())
+        try:
+            protocol = await channel.__connect__()
+            # A None here means the probe matches no grpclib attribute and
+            # the tuning silently became a no-op
+            transport = _find_transport(protocol)
+            self.assertIsNotNone(transport)
+            sock = transport.get_extra_info("socket")
+            tuned_sndbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+            self.assertGreater(tuned_sndbuf, default_sndbuf)
+        finally:
+            channel.close()
+            server.close()
+            await server.wait_closed()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import asyncio
+from typing import AsyncIterator, List
+
+from idb.grpc.stream import prefetch
+from idb.utils.testing import TestCase, ignoreTaskLeaks
+
+
+@ignoreTaskLeaks
+class PrefetchTests(TestCase):
+    async def test_yields_all_items_in_order(self) -> None:
+        async def source() -> AsyncIterator[int]:
+            for item in range(10):
+                yield item
+
+        items = [item async for item in prefetch(source(), depth=2)]
+        self.assertEqual(items, list(range(10)))
+
+    async def test_propagates_source_error_after_items(self) -> None:
+        async def source() -> AsyncIterator[int]:
+            yield 1
+            yield 2
+            raise RuntimeError("source failed")
+
+        items: List[int] = []
+        with self.assertRaises(RuntimeError):
+            async for item in prefetch(source()):
+                items.append(item)
+        self.assertEqual(items, [1, 2])
+
+    async def test_consumer_break_finalizes_source(self) -> None:
+        finalized = asyncio.Event()
+
+        async def source() -> AsyncIterator[int]:
+            try:
+                for item in range(100):
+                    yield item
+            finally:
+                finalized.set()
+
+        generator = prefetch(source(), depth=2)
+        async for item in generator:
+            break
+        await generator.aclose()
+        self.assertTrue(finalized.is_set())
@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
 
+import asyncio
+import logging
 import os
+import threading
 import urllib.parse
+from functools import lru_cache
 from logging import Logger
 from pathlib import Path
-from typing import IO, AsyncIterator, Union
+from typing import IO, AsyncIterator, List, Union
 
-import aiofiles
 import idb.common.gzip as gzip
 import idb.common.tar as tar
 from grpclib.const import Status
@@ -15,12 +18,41 @@ from grpclib.exceptions import GRPCError
 from idb.common.types import InstalledArtifact
 from idb.common.xctest import xctest_paths_to_tar
 from idb.grpc.idb_pb2 import InstallRequest, InstallResponse, Payload
-from idb.grpc.stream import Stream, drain_to_stream
+from idb.grpc.stream import Stream, drain_to_stream, prefetch
 from idb.grpc.types import CompanionClient
 from idb.utils.typing import none_throws
 
 
-CHUNK_SIZE = 16384
+DEFAULT_CHUNK_SIZE: int = 1 << 20
+# Largest payload to put in one message, leaving headroom under the 4 MiB
+# gRPC message limit for the protobuf framing
+MAX_PAYLOAD_BYTES: int = 4 * 1024 * 1024 - 16384
+
+
+def _chunk_size_from_env() -> int:
+    value = os.environ.get("IDB_INSTALL_CHUNK_SIZE")
+    if value is None:
+        return DEFAULT_CHUNK_SIZE
+    try:
+        size = int(value)
+        if size <= 0:
+            raise ValueError(value)
+    except ValueError:
+        logging.warning(
+            "Invalid IDB_INSTALL_CHUNK_SIZE %r, using the default of %d bytes",
+            value,
+            DEFAULT_CHUNK_SIZE,
+        )
+        return DEFAULT_CHUNK_SIZE
+    # An oversized override would fail every install with "message too large"
+    return min(size, MAX_PAYLOAD_BYTES)
+
+
+CHUNK_SIZE: int = _chunk_size_from_env()
+# Number of chunks the reader thread may run ahead of the gRPC send
+READ_QUEUE_DEPTH = 4
+# Batch forwarded payloads up to the same per-message payload cap
+FORWARD_BATCH_BYTES: int = MAX_PAYLOAD_BYTES
 Destination = InstallRequest.Destination
 Bundle = Union[str, IO[bytes]]
 
@@ -29,31 +61,71 @@ async def _generate_ipa_chunks(
     ipa_path: str, logger: Logger
 ) -> AsyncIterator[InstallRequest]:
     logger.debug(f"Generating Chunks for .ipa {ipa_path}")
-    async with aiofiles.open(ipa_path, "r+b") as file:
+    loop = asyncio.get_event_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=READ_QUEUE_DEPTH)
+
+    stopped = threading.Event()
+
+    def _reader() -> None:
+        # A single reusable buffer and unbuffered I/O avoids the allocation
+        # and intermediate copy that buffered read() pays per chunk
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        try:
+            with open(ipa_path, "rb", buffering=0) as file:
+                while not stopped.is_set():
+                    read = file.readinto(buffer)
+                    if not read:
+                        asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+                        return
+                    request = InstallRequest(payload=Payload(data=bytes(view[:read])))
+                    asyncio.run_coroutine_threadsafe(queue.put(request), loop).result()
+        except Exception:
+            # Unblock the consumer, the error surfaces when the future is awaited
+            asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+            raise
+
+    reader = loop.run_in_executor(None, _reader)
+    try:
         while True:
-            chunk = await file.read(CHUNK_SIZE)
-            if not chunk:
-                logger.debug(f"Finished generating .ipa chunks for {ipa_path}")
-                return
-            yield InstallRequest(payload=Payload(data=chunk))
-
-
-async def _generate_app_chunks(
-    app_path: str, logger: Logger
+            request = await queue.get()
+            if request is None:
+                break
+            yield request
+        await reader
+        logger.debug(f"Finished generating .ipa chunks for {ipa_path}")
+    finally:
+        # On early finalization (e.g. the companion aborted the stream)
+        # the thread may be blocked putting into the full queue: flag it to
+        # stop and free a slot so the pending put completes. The executor
+        # future is deliberately not awaited here, GeneratorExit must not
+        # block; the thread exits as soon as the loop resumes
+        stopped.set()
+        while not queue.empty():
+            queue.get_nowait()
+
+
+async def _chunks_to_requests(
+    chunks: AsyncIterator[bytes],
 ) -> AsyncIterator[InstallRequest]:
-    logger.debug(f"Generating chunks for .app {app_path}")
-    async for chunk in tar.generate_tar([app_path]):
-        yield InstallRequest(payload=Payload(data=chunk))
-    logger.debug(f"Finished generating .app chunks {app_path}")
-
-
-async def _generate_xctest_chunks(
-    path: str, logger: Logger
+    # A single message is reused across chunks: send_message serializes
+    # before the next chunk is requested, so mutating the payload between
+    # yields is safe and avoids two protobuf constructions per chunk.
+    # Prefetching happens on the immutable bytes, upstream of the reuse,
+    # letting tar/gzip run ahead of the gRPC send
+    request = InstallRequest(payload=Payload())
+    async for chunk in prefetch(chunks):
+        request.payload.data = chunk
+        yield request
+
+
+async def _generate_tar_chunks(
+    paths: List[str], logger: Logger
 ) -> AsyncIterator[InstallRequest]:
-    logger.debug(f"Generating chunks for {path}")
-    async for chunk in tar.generate_tar(xctest_paths_to_tar(path)):
-        yield InstallRequest(payload=Payload(data=chunk))
-    logger.debug(f"Finished generating chunks {path}")
+    logger.debug(f"Generating chunks for {paths}")
+    async for request in _chunks_to_requests(tar.generate_tar(paths)):
+        yield request
+    logger.debug(f"Finished generating chunks {paths}")
 
 
 async def _generate_dylib_chunks(
@@ -61,26 +133,8 @@ async def _generate_dylib_chunks(
 ) -> AsyncIterator[InstallRequest]:
     logger.debug(f"Generating chunks for {path}")
     yield InstallRequest(name_hint=os.path.basename(path))
-    async for chunk in gzip.generate_gzip(path):
-        yield InstallRequest(payload=Payload(data=chunk))
-    logger.debug(f"Finished generating chunks {path}")
-
-
-async def _generate_dsym_chunks(
-    path: str, logger: Logger
-) -> AsyncIterator[InstallRequest]:
-    logger.debug(f"Generating chunks for {path}")
-    async for chunk in tar.generate_tar([path]):
-        yield InstallRequest(payload=Payload(data=chunk))
-    logger.debug(f"Finished generating chunks {path}")
-
-
-async def _generate_framework_chunks(
-    path: str, logger: Logger
-) -> AsyncIterator[InstallRequest]:
-    logger.debug(f"Generating chunks for {path}")
-    async for chunk in tar.generate_tar([path]):
-        yield InstallRequest(payload=Payload(data=chunk))
+    async for request in _chunks_to_requests(gzip.generate_gzip(path)):
+        yield request
     logger.debug(f"Finished generating chunks {path}")
 
 
@@ -88,35 +142,59 @@ async def _generate_io_chunks(
     io: IO[bytes], logger: Logger
 ) -> AsyncIterator[InstallRequest]:
     logger.debug("Generating io chunks")
+    request = InstallRequest(payload=Payload())
     while True:
         chunk = io.read(CHUNK_SIZE)
         if not chunk:
-            logger.debug(f"Finished generating byte chunks")
+            logger.debug("Finished generating byte chunks")
             return
-        yield InstallRequest(payload=Payload(data=chunk))
+        request.payload.data = chunk
+        yield request
     logger.debug("Finished generating io chunks")
 
 
+# Keyed by (destination, path suffix), the suffix only disambiguates APP
+_CHUNK_GENERATORS = {
+    (InstallRequest.APP, ".ipa"): lambda path, logger: _generate_ipa_chunks(
+        ipa_path=path, logger=logger
+    ),
+    (InstallRequest.APP, ".app"): lambda path, logger: _generate_tar_chunks(
+        paths=[path], logger=logger
+    ),
+    (InstallRequest.XCTEST, None): lambda path, logger: _generate_tar_chunks(
+        paths=xctest_paths_to_tar(path), logger=logger
+    ),
+    (InstallRequest.DYLIB, None): lambda path, logger: _generate_dylib_chunks(
+        path=path, logger=logger
+    ),
+    (InstallRequest.DSYM, None): lambda path, logger: _generate_tar_chunks(
+        paths=[path], logger=logger
+    ),
+    (InstallRequest.FRAMEWORK, None): lambda path, logger: _generate_tar_chunks(
+        paths=[path], logger=logger
+    ),
+}
+
+
 def _generate_binary_chunks(
     path: str, destination: Destination, logger: Logger
 ) -> AsyncIterator[InstallRequest]:
-    if destination == InstallRequest.APP:
-        if path.endswith(".ipa"):
-            return _generate_ipa_chunks(ipa_path=path, logger=logger)
-        elif path.endswith(".app"):
-            return _generate_app_chunks(app_path=path, logger=logger)
-    elif destination == InstallRequest.XCTEST:
-        return _generate_xctest_chunks(path=path, logger=logger)
-    elif destination == InstallRequest.DYLIB:
-        return _generate_dylib_chunks(path=path, logger=logger)
-    elif destination == InstallRequest.DSYM:
-        return _generate_dsym_chunks(path=path, logger=logger)
-    elif destination == InstallRequest.FRAMEWORK:
-        return _generate_framework_chunks(path=path, logger=logger)
-    raise GRPCError(
-        status=Status(Status.FAILED_PRECONDITION),
-        message=f"install invalid for {path} {destination}",
-    )
+    suffix = os.path.splitext(path)[1] if destination == InstallRequest.APP else None
+    generator = _CHUNK_GENERATORS.get((destination, suffix))
+    if generator is None:
+        raise GRPCError(
+            status=Status(Status.FAILED_PRECONDITION),
+            message=f"install invalid for {path} {destination}",
+        )
+    return generator(path, logger)
+
+
+@lru_cache(maxsize=256)
+def _resolve_bundle_path(path: str, mtime_ns: int) -> str:
+    # resolve(strict=True) stats every path component; repeated installs of
+    # the same bundle hit the cache instead. mtime_ns is only part of the
+    # key so that a rebuilt bundle misses
+    return str(Path(path).resolve(strict=True))
 
 
 async def _install_to_destination(
@@ -128,11 +206,17 @@ async def _install_to_destination(
         if url.scheme:
             payload = Payload(url=bundle)
         else:
-            payload = Payload(file_path=str(Path(bundle).resolve(strict=True)))
+            # abspath keeps the cache key stable across working directories
+            file_path = os.path.abspath(bundle)
+            payload = Payload(
+                file_path=_resolve_bundle_path(
+                    file_path, os.stat(file_path).st_mtime_ns
+                )
+            )
         async with client.stub.install.open() as stream:
             await stream.send_message(InstallRequest(destination=destination))
-            await stream.send_message(InstallRequest(payload=payload))
-            await stream.end()
+            # end=True folds END_STREAM into the payload frame, saving a write
+            await stream.send_message(InstallRequest(payload=payload), end=True)
             response = await stream.recv_message()
             return InstalledArtifact(name=response.name, uuid=response.uuid)
     else:
@@ -179,6 +263,45 @@ async def install_framework(
     )
 
 
+async def _drain_batched(
+    stream: Stream[InstallRequest, InstallResponse],
+    generator: AsyncIterator[InstallRequest],
+    logger: Logger,
+) -> InstallResponse:
+    # Coalesces consecutive payload data messages so the forwarded stream
+    # carries a few large frames instead of one frame per client chunk
+    request = InstallRequest(payload=Payload())
+    buffer: List[bytes] = []
+    buffered = 0
+
+    async def _flush() -> None:
+        nonlocal buffered
+        if not buffer:
+            return
+        request.payload.data = b"".join(buffer)
+        del buffer[:]
+        buffered = 0
+        await stream.send_message(request)
+
+    async for message in generator:
+        if message.payload.WhichOneof("source") != "data":
+            # Not an opaque data chunk, forward it in order
+            await _flush()
+            await stream.send_message(message)
+            continue
+        data = message.payload.data
+        if buffered and buffered + len(data) > FORWARD_BATCH_BYTES:
+            await _flush()
+        buffer.append(data)
+        buffered += len(data)
+    await _flush()
+    await stream.end()
+    logger.debug("Streamed all chunks to companion, waiting for completion")
+    response = none_throws(await stream.recv_message())
+    logger.debug("Companion completed")
+    return response
+
+
 async def daemon(
     client: CompanionClient, stream: Stream[InstallResponse, InstallRequest]
 ) -> None:
@@ -191,8 +314,8 @@ async def daemon(
     async with client.stub.install.open() as forward_stream:
         await forward_stream.send_message(destination_message)
         if client.is_local or len(url):
-            await forward_stream.send_message(payload_message)
-            await forward_stream.end()
+            # Unary-style exchange: END_STREAM travels on the payload frame
+            await forward_stream.send_message(payload_message, end=True)
             response = none_throws(await forward_stream.recv_message())
         elif file_path:
             response = await drain_to_stream(
@@ -204,7 +327,7 @@ async def daemon(
             )
         elif data:
             await forward_stream.send_message(payload_message)
-            response = await drain_to_stream(
+            response = await _drain_batched(
                 stream=forward_stream, generator=stream, logger=client.logger
             )
         else:
@@ -1,10 +1,9 @@
 #!/usr/bin/env python3
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
 
-import asyncio
 import tempfile
 from logging import Logger
-from typing import AsyncContextManager, Dict, List, Optional
+from typing import AsyncContextManager, Dict, List, Optional, Tuple
 
 from grpclib.client import Channel
 from idb.common.companion_spawner import CompanionSpawner
@@ -14,6 +13,7 @@ from idb.common.types import (
     ConnectionDestination,
     TargetDescription,
 )
+from idb.grpc.channel import create_channel
 from idb.grpc.idb_grpc import CompanionServiceStub
 from idb.grpc.idb_pb2 import ConnectRequest
 from idb.grpc.types import CompanionClient
@@ -29,10 +29,14 @@ class CompanionManager:
             CompanionSpawner(companion_path=companion_path) if companion_path else None
         )
         self._stub_map: Dict[str, CompanionServiceStub] = {}
+        self._address_channel_map: Dict[Tuple[str, int], Channel] = {}
+        self._address_stub_map: Dict[Tuple[str, int], CompanionServiceStub] = {}
         self._logger = logger
 
     def close(self) -> None:
         self._logger.info("Stopping companion manager")
+        for channel in self._address_channel_map.values():
+            channel.close()
         if self.companion_spawner:
             self.companion_spawner.close()
 
@@ -244,6 +248,14 @@ class CompanionManager:
                 )
 
     def get_stub_for_address(self, host: str, port: int) -> CompanionServiceStub:
+        # Reuse the channel per companion address so back-to-back calls share
+        # one TCP + HTTP/2 connection instead of re-establishing it
+        address = (host, port)
+        if address in self._address_stub_map:
+            return self._address_stub_map[address]
         self._logger.debug(f"creating grpc stub for companion at {host}:{port}")
-        channel = Channel(host, port, loop=asyncio.get_event_loop())
-        return CompanionServiceStub(channel)
+        channel = create_channel(host, port)
+        stub = CompanionServiceStub(channel)
+        self._address_channel_map[address] = channel
+        self._address_stub_map[address] = stub
+        return stub
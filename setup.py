@@ -57,6 +57,7 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ],
     install_requires=["aiofiles", "grpclib", "protobuf"],
+    extras_require={"uvloop": ["uvloop"]},
     setup_requires=["grpcio-tools", "grpclib"],
     entry_points={"console_scripts": ["idb = idb.cli.main:main"]},
     python_requires=">=3.6",